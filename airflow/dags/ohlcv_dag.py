@@ -0,0 +1,215 @@
+import os
+import sys
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+# Written against the Airflow 2 TaskFlow API (tested on 2.10), see the README
+from airflow.decorators import dag, task
+
+# Make the project modules importable when Airflow loads this file from airflow/dags
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+if PROJECT_ROOT not in sys.path:
+    sys.path.append(PROJECT_ROOT)
+
+from etl.binance_extract import BinanceExtractor  # noqa: E402
+from etl.binance_transform import BinanceTransform, interval_to_offset  # noqa: E402
+from sql.sql_load import SQLLoader  # noqa: E402
+
+
+# Pools must exist in the Airflow metadata DB (see airflow/pools.json).
+# binance_api slots are sized to the request weight budget, postgres slots to the DB connection limit.
+BINANCE_POOL = 'binance_api'
+POSTGRES_POOL = 'postgres'
+
+LOOKUP_VIEW = 'vw_exchange_ticker_asset_lookup'
+
+
+def staging_path(dag_id: str, ticker_id: Any, stage: str, ts_nodash: str, staging_dir: Optional[str] = None) -> str:
+    """
+    Builds the path of a staged DataFrame shared between the tasks of one ticker.
+
+    The directory must be shared by every worker (NFS, a mounted volume, ...), since
+    transform and load may run on a different worker than the task that wrote the file.
+    Each DAG stages into its own subdirectory, so DAGs on the same schedule never touch
+    each other's files.
+
+    Args:
+        dag_id (str): Id of the DAG the file belongs to.
+        ticker_id (Any): Ticker id from the lookup view.
+        stage (str): Name of the stage that wrote the file (e.g. 'raw', 'wrangled').
+        ts_nodash (str): Logical timestamp of the DAG run.
+        staging_dir (Optional[str]): Shared directory for staged files. Defaults to the ODM_STAGING_DIR environment variable.
+
+    Returns:
+        str: Absolute path of the staged file.
+
+    Raises:
+        EnvironmentError: If no staging directory is given and ODM_STAGING_DIR is not set.
+    """
+    if staging_dir is None:
+        staging_dir = os.getenv('ODM_STAGING_DIR')
+    if not staging_dir:
+        raise EnvironmentError("No staging directory. Set ODM_STAGING_DIR to a directory shared by all Airflow workers.")
+    staging_dir = os.path.join(staging_dir, dag_id)
+    os.makedirs(staging_dir, exist_ok=True)
+    return os.path.join(staging_dir, f'{ts_nodash}_{ticker_id}_{stage}.pkl')
+
+
+def create_ohlcv_dag(dag_id: str = 'binance_ohlcv',
+                     extractor_factory: Callable[[], Any] = BinanceExtractor,
+                     loader_factory: Callable[[], Any] = SQLLoader,
+                     interval: str = '1d',
+                     start_date: str = '5 years ago UTC',
+                     exchange_name: str = 'Binance',
+                     schema: str = 'crypto',
+                     table_name: str = 'ohlcv_daily',
+                     staging_dir: Optional[str] = None,
+                     schedule: Optional[str] = '@daily'):
+    """
+    Builds a DAG that refreshes OHLCV data with one mapped task per active ticker.
+
+    Each ticker runs extract -> transform -> load. Tasks hand each other the lookup row plus
+    the path of a staged DataFrame, so no DataFrame ever travels over XCom. Each task only
+    builds the component it needs, so Binance calls stay inside the binance_api pool and
+    database connections inside the postgres pool.
+
+    Only bars newer than the latest stored bar of a ticker are loaded, and only bars that
+    closed by the end of the data interval, so reruns never insert a bar twice and a bar
+    is never stored while still open, even when interval is coarser than the schedule.
+
+    Args:
+        dag_id (str): DAG id. Defaults to 'binance_ohlcv'.
+        extractor_factory (Callable): Returns a BinanceExtractor (or a fake with get_ohlcv). Defaults to BinanceExtractor.
+        loader_factory (Callable): Returns a SQLLoader (or a fake with the same methods). Defaults to SQLLoader.
+        interval (str): The candlestick interval (e.g., '1d', '1h', '15m'). Defaults to '1d'.
+        start_date (str): Start of the history for tickers with no stored bars. Defaults to '5 years ago UTC'.
+        exchange_name (str): Exchange to select from the lookup view. Defaults to 'Binance'.
+        schema (str): Target schema for the load. Defaults to 'crypto'.
+        table_name (str): Target table for the load. Defaults to 'ohlcv_daily'.
+        staging_dir (Optional[str]): Shared directory for staged DataFrames. Defaults to ODM_STAGING_DIR.
+        schedule (Optional[str]): Airflow schedule. Defaults to '@daily'.
+
+    Returns:
+        DAG: The constructed DAG.
+    """
+
+    @dag(dag_id=dag_id,
+         schedule=schedule,
+         start_date=datetime(2024, 1, 1),
+         catchup=False,
+         max_active_runs=1,
+         default_args={'retries': 2, 'retry_delay': timedelta(minutes=5)},
+         tags=['ohlcv', 'binance'])
+    def ohlcv_dag():
+
+        @task(pool=POSTGRES_POOL)
+        def get_tickers() -> List[Dict[str, Any]]:
+            loader = loader_factory()
+            df = loader.read_sql_to_df(table_name=LOOKUP_VIEW, schema='public')
+            df = df[df['exchange_name'] == exchange_name]
+            # Only pull tickers that are still flagged as trading
+            if 'trading' in df.columns:
+                df = df[df['trading'].astype(bool)]
+
+            # Latest stored bar per ticker, so each run only pulls what is missing
+            rows = loader.query_full(f'SELECT ticker_id, exchange_id, max(date) AS last_date '
+                                     f'FROM {schema}.{table_name} GROUP BY ticker_id, exchange_id')
+            last_dates = {(row['ticker_id'], row['exchange_id']): row['last_date'] for row in rows}
+
+            tickers = []
+            for row in df.itertuples():
+                last_date = last_dates.get((row.ticker_id, row.exchange_id))
+                if last_date is not None:
+                    # Bars are stored as naive UTC, normalise in case the column is timestamptz
+                    last_date = pd.Timestamp(last_date)
+                    if last_date.tzinfo is not None:
+                        last_date = last_date.tz_convert('UTC').tz_localize(None)
+                tickers.append({
+                    'ticker_id': int(row.ticker_id),
+                    'exchange_id': int(row.exchange_id),
+                    'ticker_symbol': row.ticker_symbol,
+                    'exchange_name': row.exchange_name,
+                    'last_date': None if last_date is None else last_date.isoformat(),
+                })
+            print(f'{len(tickers)} tickers found for {exchange_name}')
+            return tickers
+
+        @task(pool=BINANCE_POOL)
+        def extract(ticker: Dict[str, Any],
+                    ts_nodash: Optional[str] = None,
+                    data_interval_end: Optional[datetime] = None) -> Dict[str, Any]:
+            end = pd.Timestamp(data_interval_end).tz_convert('UTC')
+            start = start_date
+            if ticker['last_date'] is not None:
+                start = int(pd.Timestamp(ticker['last_date']).tz_localize('UTC').timestamp() * 1000)
+
+            extractor = extractor_factory()
+            # Errors (rate limits, network) raise here so Airflow retries the task
+            df = extractor.get_ohlcv(ticker=ticker['ticker_symbol'].replace('/', ''),
+                                     interval=interval,
+                                     start_date=start,
+                                     end_date=int(end.timestamp() * 1000),
+                                     raise_errors=True)
+            handle = {**ticker, 'end_date': end.tz_localize(None).isoformat(), 'path': None}
+            if df is None:
+                return handle
+            path = staging_path(dag_id, ticker['ticker_id'], 'raw', ts_nodash, staging_dir)
+            df.to_pickle(path)
+            return {**handle, 'path': path}
+
+        @task
+        def transform(handle: Dict[str, Any], ts_nodash: Optional[str] = None) -> Dict[str, Any]:
+            if handle['path'] is None:
+                print(f"No new data for {handle['ticker_symbol']}, skipping transform")
+                return handle
+
+            # BinanceTransform only needs somewhere to keep its DataFrames, not a full DataManager
+            holder = SimpleNamespace(df_ohlcv=pd.read_pickle(handle['path']), df_sql=None, df_ohlcv_wrangled=None)
+            transform = BinanceTransform(manager=holder)
+            df = transform.clean_ohlcv(ticker_symbol=handle['ticker_symbol'],
+                                       exchange_name=handle['exchange_name'])
+
+            # Drop bars that are already stored and bars that had not closed by the end of the interval
+            keep = df['date'] + interval_to_offset(interval) <= pd.Timestamp(handle['end_date'])
+            if handle['last_date'] is not None:
+                keep &= df['date'] > pd.Timestamp(handle['last_date'])
+            holder.df_ohlcv = df[keep]
+            if holder.df_ohlcv.empty:
+                print(f"No new bars for {handle['ticker_symbol']}")
+                os.remove(handle['path'])
+                return {**handle, 'path': None}
+
+            lookup = {col: handle[col] for col in ['ticker_id', 'exchange_id', 'ticker_symbol', 'exchange_name']}
+            transform.wrangle_ohlcv(df_sql=pd.DataFrame([lookup]))
+            path = staging_path(dag_id, handle['ticker_id'], 'wrangled', ts_nodash, staging_dir)
+            holder.df_ohlcv_wrangled.to_pickle(path)
+            # Only drop the raw file once the next stage is staged, so a retry can start over
+            os.remove(handle['path'])
+            return {**handle, 'path': path}
+
+        @task(pool=POSTGRES_POOL)
+        def load(handle: Dict[str, Any]) -> int:
+            if handle['path'] is None:
+                return 0
+            loader = loader_factory()
+            df = pd.read_pickle(handle['path'])
+            loader.insert_df_to_sql(df=df, schema=schema, table_name=table_name)
+            os.remove(handle['path'])
+            print(f"Loaded {len(df)} rows for {handle['ticker_symbol']}")
+            return len(df)
+
+        # Each task hands the next one a small dict (lookup row + staged file path)
+        raw = extract.expand(ticker=get_tickers())
+        wrangled = transform.expand(handle=raw)
+        load.expand(handle=wrangled)
+
+    return ohlcv_dag()
+
+
+binance_ohlcv = create_ohlcv_dag()
+
+
+if __name__ == '__main__':
+    binance_ohlcv.test()
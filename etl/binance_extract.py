@@ -3,7 +3,7 @@ import os
 from datetime import datetime, timedelta
 import pandas as pd
 from binance import Client
-from typing import Optional
+from typing import Optional, Union
 from dotenv import load_dotenv
 
 
@@ -89,14 +89,21 @@ class BinanceExtractor:
     def get_ohlcv(self,
                   ticker: str = 'BTCUSDT',
                   interval: str = '1d',
-                  start_date: str = '5 years ago UTC') -> Optional[pd.DataFrame]:
+                  start_date: Union[str, int] = '5 years ago UTC',
+                  end_date: Optional[Union[str, int]] = None,
+                  raise_errors: bool = False) -> Optional[pd.DataFrame]:
         """
         Retrieves historical price data for a cryptocurrency from Binance.
 
         Args:
             ticker (str): The trading pair symbol (e.g., 'BTCUSDT'). Defaults to 'BTCUSDT'.
             interval (str): The candlestick interval (e.g., '1d', '1h', '15m'). Defaults to '1d'.
-            start_date (str): The start date for historical data. Defaults to '5 years ago UTC'.
+            start_date (Union[str, int]): The start date for historical data, a date string or milliseconds
+                                          since the epoch. Defaults to '5 years ago UTC'.
+            end_date (Optional[Union[str, int]]): The end date for historical data, a date string or milliseconds
+                                                  since the epoch. Defaults to None (up to now).
+            raise_errors (bool): If True, API and network errors are raised instead of returning None,
+                                 so None only ever means an empty result. Defaults to False.
 
         Returns:
             Optional[pd.DataFrame]: DataFrame containing historical price data, or None if no data is retrieved.
@@ -107,7 +114,7 @@ class BinanceExtractor:
         """
         try:
             # Retrieve historical price data
-            klines = self.client.get_historical_klines(ticker, interval, start_date)
+            klines = self.client.get_historical_klines(ticker, interval, start_date, end_date)
 
             # Check if data was returned
             if not klines:
@@ -147,4 +154,6 @@ class BinanceExtractor:
 
         except Exception as e:
             print(f"Error retrieving data: {str(e)}")
+            if raise_errors:
+                raise
             return None
\ No newline at end of file
@@ -1,11 +1,34 @@
 
 import os
+import re
 from datetime import datetime, timedelta
 import pandas as pd
 from binance import Client
-from typing import Optional
+from typing import Optional, Union
 
 
+def interval_to_offset(interval: str) -> Union[pd.Timedelta, pd.DateOffset]:
+    """
+    Converts a Binance candlestick interval into the length of one bar.
+
+    Args:
+        interval (str): The candlestick interval (e.g., '15m', '4h', '1d', '1w', '1M').
+
+    Returns:
+        Union[pd.Timedelta, pd.DateOffset]: Bar length, a DateOffset for month intervals.
+
+    Raises:
+        ValueError: If the interval is not a Binance interval.
+    """
+    match = re.fullmatch(r'(\d+)([smhdwM])', interval)
+    if match is None:
+        raise ValueError(f"Invalid interval '{interval}'. Use a count and a unit, e.g. '15m', '4h', '1d'.")
+    count, unit = int(match.group(1)), match.group(2)
+    # pandas reads 'M' as minutes, so months need a calendar offset
+    if unit == 'M':
+        return pd.DateOffset(months=count)
+    return pd.Timedelta(count, unit={'s': 's', 'm': 'min', 'h': 'h', 'd': 'D', 'w': 'W'}[unit])
+
 
 class BinanceTransform():
     
@@ -19,7 +42,9 @@ class BinanceTransform():
     def clean_ohlcv(self,
                         price: Optional[bool] = None,
                         df: Optional[pd.DataFrame] = None,
-                        remove_last_n: int = 0) -> pd.DataFrame:
+                        remove_last_n: int = 0,
+                        ticker_symbol: str = 'BTC/USDT',
+                        exchange_name: str = 'Binance') -> pd.DataFrame:
         """
         Cleans and formats cryptocurrency price data.
 
@@ -32,6 +57,8 @@ class BinanceTransform():
                                 Defaults to None.
             remove_last_n (int): Number of rows to remove from the end of the DataFrame.
                                 If 0, no rows are removed. Defaults to 0.
+            ticker_symbol (str): Ticker symbol stamped on every row. Defaults to 'BTC/USDT'.
+            exchange_name (str): Exchange name stamped on every row. Defaults to 'Binance'.
 
         Returns:
             pd.DataFrame: The cleaned DataFrame.
@@ -75,8 +102,8 @@ class BinanceTransform():
             df = df[new_order]
 
         # Add identifying columns
-        df["ticker_symbol"] = "BTC/USDT" # make attribue
-        df["exchange_name"] = "Binance" # make attritube
+        df["ticker_symbol"] = ticker_symbol
+        df["exchange_name"] = exchange_name
         
 
         # Reset index
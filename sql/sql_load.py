@@ -1,7 +1,192 @@
+import io
 import os
+import re
+import struct
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine, text, insert, MetaData, Table
-from typing import Optional, Dict, Any
+from sqlalchemy.dialects import postgresql
+from typing import Optional, Dict, Any, Tuple
+
+
+# Binance style interval unit -> PostgreSQL interval / date_trunc unit
+INTERVAL_UNITS = {'m': 'minute', 'h': 'hour', 'd': 'day', 'w': 'week', 'M': 'month'}
+OHLCV_FIELDS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+# Binary COPY layout of one OHLCV row when no field is NULL:
+# int16 field count, then int32 length + 8 byte value per field
+OHLCV_COPY_DTYPE = np.dtype([('n_fields', '>i2')] + [
+    item for field in OHLCV_FIELDS
+    for item in ((f'{field}_len', '>i4'), (field, '>i8' if field == 'date' else '>f8'))
+])
+COPY_SIGNATURE = b'PGCOPY\n\xff\r\n\x00'
+# PostgreSQL timestamps are microseconds since 2000-01-01
+PG_EPOCH_US = 946684800 * 1_000_000
+
+
+def insert_on_conflict_do_nothing(table, conn, keys, data_iter) -> int:
+    """
+    pandas to_sql insert method that skips rows violating a unique constraint (PostgreSQL only).
+
+    Args:
+        table (pandas.io.sql.SQLTable): Target table.
+        conn (Connection): SQLAlchemy connection.
+        keys (list): Column names.
+        data_iter (Iterable): Row values.
+
+    Returns:
+        int: Number of rows actually inserted.
+    """
+    rows = [dict(zip(keys, row)) for row in data_iter]
+    result = conn.execute(postgresql.insert(table.table).values(rows).on_conflict_do_nothing())
+    return result.rowcount
+
+
+def decode_ohlcv_copy(data) -> Dict[str, np.ndarray]:
+    """
+    Decodes a binary COPY stream of (timestamp, 5 x float8) rows into NumPy arrays.
+
+    Args:
+        data (bytes-like): The raw COPY ... WITH (FORMAT binary) output.
+
+    Returns:
+        Dict[str, np.ndarray]: 'date' (datetime64[us]) and 'open', 'high', 'low', 'close', 'volume' (float64) arrays.
+
+    Raises:
+        ValueError: If the data is not a complete binary COPY stream of 8 byte fields.
+    """
+    data = memoryview(data)
+    if bytes(data[:len(COPY_SIGNATURE)]) != COPY_SIGNATURE:
+        raise ValueError("Data is not in PostgreSQL binary COPY format")
+    if len(data) < len(COPY_SIGNATURE) + 8 + 2:
+        raise ValueError("Binary COPY stream is truncated")
+    extension_len = struct.unpack_from('>i', data, len(COPY_SIGNATURE) + 4)[0]
+    header_len = len(COPY_SIGNATURE) + 8 + extension_len
+    if extension_len < 0 or header_len + 2 > len(data):
+        raise ValueError("Binary COPY stream is truncated")
+    if struct.unpack_from('>h', data, len(data) - 2)[0] != -1:
+        raise ValueError("Binary COPY stream has no end of data trailer, it is truncated")
+    # Body sits between the header and the int16 -1 trailer
+    body = data[header_len:len(data) - 2]
+
+    if len(body) % OHLCV_COPY_DTYPE.itemsize == 0:
+        rows = np.frombuffer(body, dtype=OHLCV_COPY_DTYPE)
+        fixed_width = (rows['n_fields'] == len(OHLCV_FIELDS)).all() and all(
+            (rows[f'{field}_len'] == 8).all() for field in OHLCV_FIELDS)
+    else:
+        fixed_width = False
+
+    if fixed_width:
+        columns = {field: rows[field].astype('<f8') for field in OHLCV_FIELDS[1:]}
+        dates = rows['date'].astype('<i8')
+    else:
+        # Some field is NULL, walk the rows one by one and use NaN/NaT for NULLs
+        def read(fmt: str, pos: int):
+            if pos + struct.calcsize(fmt) > len(body):
+                raise ValueError("Binary COPY stream is truncated")
+            return struct.unpack_from(fmt, body, pos)[0]
+
+        values = {field: [] for field in OHLCV_FIELDS}
+        pos = 0
+        while pos < len(body):
+            n_fields = read('>h', pos)
+            if n_fields != len(OHLCV_FIELDS):
+                raise ValueError(f"Expected {len(OHLCV_FIELDS)} fields per row, got {n_fields}")
+            pos += 2
+            for field in OHLCV_FIELDS:
+                length = read('>i', pos)
+                pos += 4
+                if length == -1:
+                    values[field].append(np.iinfo(np.int64).min if field == 'date' else np.nan)
+                    continue
+                if length != 8:
+                    raise ValueError(f"Expected an 8 byte '{field}' field, got {length} bytes")
+                values[field].append(read('>q' if field == 'date' else '>d', pos))
+                pos += length
+        columns = {field: np.array(values[field], dtype='<f8') for field in OHLCV_FIELDS[1:]}
+        dates = np.array(values['date'], dtype='<i8')
+
+    nat = dates == np.iinfo(np.int64).min
+    dates = (dates + PG_EPOCH_US).astype('datetime64[us]')
+    dates[nat] = np.datetime64('NaT')
+    return {'date': dates, **columns}
+
+
+def build_ohlcv_bucket_query(ticker_symbol: str = 'BTC/USDT',
+                              start: str = None,
+                              end: str = None,
+                              interval: str = '1h',
+                              exchange_name: str = 'Binance',
+                              schema: str = 'crypto',
+                              table_name: str = 'ohlcv_daily',
+                              timescale: bool = True) -> Tuple[str, Dict[str, Any]]:
+    """
+    Builds the bucketed OHLCV query used by SQLLoader.read_ohlcv_bucketed.
+
+    On TimescaleDB buckets come from time_bucket and first/last. On plain PostgreSQL single unit
+    intervals use date_trunc and multi unit intervals use date_bin (PostgreSQL 14+), anchored on
+    Monday 2000-01-03 like time_bucket so both paths return the same buckets.
+
+    Args:
+        ticker_symbol (str): Ticker symbol as stored in the database. Defaults to 'BTC/USDT'.
+        start (str, optional): Inclusive start of the time range. Defaults to None (no lower bound).
+        end (str, optional): Exclusive end of the time range. Defaults to None (no upper bound).
+        interval (str): Target bar size (e.g., '15m', '4h', '1d', '1w'). Defaults to '1h'.
+        exchange_name (str): Exchange name as stored in the database. Defaults to 'Binance'.
+        schema (str): Schema of the OHLCV table. Defaults to 'crypto'.
+        table_name (str): OHLCV table. Defaults to 'ohlcv_daily'.
+        timescale (bool): Use TimescaleDB time_bucket/first/last. Defaults to True.
+
+    Returns:
+        Tuple[str, Dict[str, Any]]: The SELECT statement with pyformat placeholders and its parameters.
+
+    Raises:
+        ValueError: If the interval is not understood or not supported without TimescaleDB.
+    """
+    match = re.fullmatch(r'(\d+)([mhdwM])', interval)
+    if match is None or int(match.group(1)) < 1:
+        raise ValueError(f"Invalid interval '{interval}'. Use a count and a unit, e.g. '15m', '4h', '1d'.")
+    count, unit = int(match.group(1)), INTERVAL_UNITS[match.group(2)]
+
+    if timescale:
+        bucket = 'time_bucket(%(bucket)s::interval, o.date)'
+        first_open = 'first(o.open, o.date)'
+        last_close = 'last(o.close, o.date)'
+    else:
+        if count == 1:
+            bucket = 'date_trunc(%(unit)s, o.date)'
+        elif unit == 'month':
+            # date_bin only takes fixed length strides
+            raise ValueError(f"Interval '{interval}' needs TimescaleDB, date_bin does not support months.")
+        else:
+            bucket = "date_bin(%(bucket)s::interval, o.date, TIMESTAMP '2000-01-03')"
+        first_open = '(array_agg(o.open ORDER BY o.date))[1]'
+        last_close = '(array_agg(o.close ORDER BY o.date DESC))[1]'
+
+    quote = postgresql.dialect().identifier_preparer.quote
+    select = f"""
+        SELECT ({bucket})::timestamp AS bucket,
+               {first_open}::float8, max(o.high)::float8, min(o.low)::float8,
+               {last_close}::float8, sum(o.volume)::float8
+        FROM {quote(schema)}.{quote(table_name)} o
+        JOIN public.vw_exchange_ticker_asset_lookup l
+          ON o.ticker_id = l.ticker_id AND o.exchange_id = l.exchange_id
+        WHERE l.ticker_symbol = %(ticker_symbol)s
+          AND l.exchange_name = %(exchange_name)s"""
+    if start is not None:
+        select += ' AND o.date >= %(start)s'
+    if end is not None:
+        select += ' AND o.date < %(end)s'
+    select += ' GROUP BY bucket ORDER BY bucket'
+    params = {
+        'bucket': f'{count} {unit}s',
+        'unit': unit,
+        'ticker_symbol': ticker_symbol,
+        'exchange_name': exchange_name,
+        'start': start,
+        'end': end,
+    }
+    return select, params
 
 
 class SQLLoader:
@@ -57,7 +242,8 @@ class SQLLoader:
 
 
 
-    def insert_df_to_sql(self, df=None, index = False,  schema='crypto', table_name='ohlcv_daily', if_exists='append', **kwargs):
+    def insert_df_to_sql(self, df=None, index = False,  schema='crypto', table_name='ohlcv_daily', if_exists='append',
+                         skip_duplicates=False, **kwargs):
         if df is None:
             df = self.manager.df_ohlcv_wrangled
             print(df)
@@ -69,7 +255,64 @@ class SQLLoader:
 
         
        
-        df.to_sql(table_name, schema=schema, con=self.engine, if_exists=if_exists, index=index)
+        # skip_duplicates needs a unique constraint on the table, e.g. (ticker_id, exchange_id, date)
+        method = insert_on_conflict_do_nothing if skip_duplicates else None
+        df.to_sql(table_name, schema=schema, con=self.engine, if_exists=if_exists, index=index, method=method)
         print("Data inserted successfully.")
-    
 
+
+
+    def read_ohlcv_bucketed(self,
+                            ticker_symbol: str = 'BTC/USDT',
+                            start: str = None,
+                            end: str = None,
+                            interval: str = '1h',
+                            exchange_name: str = 'Binance',
+                            schema: str = 'crypto',
+                            table_name: str = 'ohlcv_daily',
+                            timescale: bool = True) -> Dict[str, np.ndarray]:
+        """
+        Reads OHLCV bars for one ticker, aggregated to a coarser interval inside the database.
+
+        The aggregation runs server side (time_bucket on TimescaleDB, date_trunc/date_bin otherwise) and
+        the result is streamed back with binary COPY ... TO STDOUT, then decoded straight into
+        NumPy arrays without building Python row objects. The query runs with the session time
+        zone set to UTC, so both paths put day and week boundaries at UTC midnight and timestamptz
+        columns come back as UTC.
+
+        Args:
+            ticker_symbol (str): Ticker symbol as stored in the database. Defaults to 'BTC/USDT'.
+            start (str, optional): Inclusive start of the time range. Defaults to None (no lower bound).
+            end (str, optional): Exclusive end of the time range. Defaults to None (no upper bound).
+            interval (str): Target bar size (e.g., '15m', '4h', '1d', '1w'). Defaults to '1h'.
+            exchange_name (str): Exchange name as stored in the database. Defaults to 'Binance'.
+            schema (str): Schema of the OHLCV table. Defaults to 'crypto'.
+            table_name (str): OHLCV table. Defaults to 'ohlcv_daily'.
+            timescale (bool): Use TimescaleDB time_bucket/first/last. If False, plain PostgreSQL is used,
+                              see build_ohlcv_bucket_query. Defaults to True.
+
+        Returns:
+            Dict[str, np.ndarray]: 'date' (datetime64[us]) and 'open', 'high', 'low', 'close', 'volume' (float64) arrays.
+
+        Raises:
+            ValueError: If the interval is not understood or not supported without TimescaleDB.
+        """
+        select, params = build_ohlcv_bucket_query(ticker_symbol=ticker_symbol, start=start, end=end,
+                                                  interval=interval, exchange_name=exchange_name,
+                                                  schema=schema, table_name=table_name, timescale=timescale)
+
+        buffer = io.BytesIO()
+        connection = self.engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                # Scoped to this transaction, which is rolled back when the connection goes back to the pool
+                cursor.execute("SET LOCAL TIME ZONE 'UTC'")
+                # COPY does not take bind parameters, so they are inlined with the driver's quoting
+                query = cursor.mogrify(select, params).decode('utf-8')
+                cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT binary)', buffer)
+        finally:
+            connection.close()
+
+        arrays = decode_ohlcv_copy(buffer.getbuffer())
+        print(f'Read {len(arrays["date"])} {interval} bars for {ticker_symbol}')
+        return arrays
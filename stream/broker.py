@@ -0,0 +1,271 @@
+import os
+import json
+import time
+import zlib
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+
+# A single message read from a topic partition
+Record = namedtuple('Record', ['partition', 'offset', 'key', 'value'])
+
+
+def partition_for(key: bytes, num_partitions: int) -> int:
+    """
+    Maps a message key to a partition. Uses crc32 so the mapping is stable across processes.
+
+    Args:
+        key (bytes): The message key (e.g. the ticker symbol).
+        num_partitions (int): Number of partitions in the topic.
+
+    Returns:
+        int: The partition index.
+    """
+    return zlib.crc32(key) % num_partitions
+
+
+class FileBroker:
+    """
+    A file-backed stand-in for a Kafka broker, for local runs and tests.
+
+    Each topic is a directory with one append-only JSON lines file per partition.
+    Offsets are byte positions in the partition file, and each consumer group keeps
+    one committed offset file per partition, so consumers of a group only ever write
+    the offsets of their own partitions. Supports one producer process, and consumer
+    processes as long as no two consumers of a group are assigned the same partition.
+
+    Attributes:
+        root (str): Directory holding the topic directories
+        num_partitions (int): Number of partitions used for new topics
+        poll_interval (float): Seconds consumers sleep between reads of an idle topic
+    """
+
+    def __init__(self, root: str = 'Data/bus', num_partitions: int = 4, poll_interval: float = 0.2):
+        """
+        Initialize the FileBroker.
+
+        Args:
+            root (str): Directory holding the topic directories. Defaults to 'Data/bus'.
+            num_partitions (int): Number of partitions used for new topics. Defaults to 4.
+            poll_interval (float): Seconds consumers sleep between reads of an idle topic. Defaults to 0.2.
+        """
+        self.root = root
+        self.num_partitions = num_partitions
+        self.poll_interval = poll_interval
+        os.makedirs(root, exist_ok=True)
+        print("FileBroker initialized")
+
+    def topic_dir(self, topic: str) -> str:
+        path = os.path.join(self.root, topic)
+        if not os.path.isdir(path):
+            os.makedirs(path, exist_ok=True)
+            for partition in range(self.num_partitions):
+                open(self.partition_path(topic, partition), 'a').close()
+        return path
+
+    def partition_path(self, topic: str, partition: int) -> str:
+        return os.path.join(self.root, topic, f'partition-{partition}.log')
+
+    def partitions(self, topic: str) -> List[int]:
+        names = os.listdir(self.topic_dir(topic))
+        return sorted(int(name[len('partition-'):-len('.log')]) for name in names
+                      if name.startswith('partition-') and name.endswith('.log'))
+
+    def produce(self, topic: str, key: bytes, value: bytes) -> None:
+        partition = partition_for(key, len(self.partitions(topic)))
+        line = json.dumps({'key': key.decode('utf-8'), 'value': value.decode('utf-8')})
+        with open(self.partition_path(topic, partition), 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+    def flush(self) -> None:
+        # Every produce call writes straight to disk
+        pass
+
+    def consumer(self, topic: str, group_id: str, partitions: Optional[List[int]] = None) -> 'FileConsumer':
+        return FileConsumer(self, topic, group_id, partitions)
+
+
+class FileConsumer:
+    """
+    Reads a FileBroker topic on behalf of a consumer group.
+
+    Attributes:
+        broker (FileBroker): The broker holding the topic
+        topic (str): Topic name
+        group_id (str): Consumer group name
+        assigned (List[int]): Partitions read by this consumer
+        positions (Dict[int, int]): Next byte offset to read per partition
+    """
+
+    def __init__(self, broker: FileBroker, topic: str, group_id: str, partitions: Optional[List[int]] = None):
+        """
+        Initialize the FileConsumer at the group's committed offsets.
+
+        Args:
+            broker (FileBroker): The broker holding the topic.
+            topic (str): Topic name.
+            group_id (str): Consumer group name.
+            partitions (Optional[List[int]]): Partitions to read. Defaults to all partitions,
+                                              pass disjoint subsets to split a group across processes.
+        """
+        self.broker = broker
+        self.topic = topic
+        self.group_id = group_id
+        self.assigned = partitions if partitions is not None else broker.partitions(topic)
+        self.positions = self.committed()
+
+    def offsets_path(self, partition: int) -> str:
+        return os.path.join(self.broker.topic_dir(self.topic), f'offsets-{self.group_id}-{partition}')
+
+    def committed(self) -> Dict[int, int]:
+        committed = {}
+        for partition in self.assigned:
+            committed[partition] = 0
+            if os.path.exists(self.offsets_path(partition)):
+                with open(self.offsets_path(partition), encoding='utf-8') as f:
+                    committed[partition] = int(f.read())
+        return committed
+
+    def poll(self, max_records: int = 500, timeout: float = 1.0) -> List[Record]:
+        # Like KafkaConsumer.poll, wait up to timeout for messages instead of spinning on an idle topic
+        deadline = time.monotonic() + timeout
+        while True:
+            records = self.read(max_records)
+            remaining = deadline - time.monotonic()
+            if records or remaining <= 0:
+                return records
+            time.sleep(min(self.broker.poll_interval, remaining))
+
+    def read(self, max_records: int) -> List[Record]:
+        records = []
+        for partition in self.assigned:
+            with open(self.broker.partition_path(self.topic, partition), 'rb') as f:
+                f.seek(self.positions[partition])
+                while len(records) < max_records:
+                    offset = f.tell()
+                    line = f.readline()
+                    # Stop at a line the producer has not finished writing yet
+                    if not line.endswith(b'\n'):
+                        break
+                    message = json.loads(line)
+                    records.append(Record(partition, offset, message['key'].encode('utf-8'),
+                                          message['value'].encode('utf-8')))
+                    self.positions[partition] = f.tell()
+            if len(records) >= max_records:
+                break
+        return records
+
+    def commit(self) -> None:
+        for partition, offset in self.positions.items():
+            # Write then rename so a crash never leaves a half-written offsets file
+            path = self.offsets_path(partition)
+            with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+                f.write(str(offset))
+            os.replace(f'{path}.tmp', path)
+
+    def rollback(self) -> None:
+        self.positions = self.committed()
+
+    def close(self) -> None:
+        pass
+
+
+class KafkaBroker:
+    """
+    Thin wrapper around kafka-python for any Kafka-compatible broker (Kafka, Redpanda, ...).
+
+    Keys are hashed by the Kafka partitioner, so every message for a ticker symbol
+    lands in the same partition and keeps its order.
+
+    Attributes:
+        bootstrap_servers (str): Comma separated broker addresses
+        config (dict): Extra kafka-python settings passed to producers and consumers
+        producer (KafkaProducer): Producer instance, created on first use
+        pending (list): Send futures not yet checked by flush()
+        timeout (float): Seconds flush() waits for each send to be acknowledged
+    """
+
+    def __init__(self,
+                 bootstrap_servers: str = None,
+                 bootstrap_env_var: str = 'KAFKA_BOOTSTRAP_SERVERS',
+                 timeout: float = 30.0,
+                 **config):
+        """
+        Initialize the KafkaBroker.
+
+        Args:
+            bootstrap_servers (str, optional): Broker addresses. Defaults to the bootstrap_env_var environment variable.
+            bootstrap_env_var (str, optional): Environment variable for the broker addresses. Defaults to 'KAFKA_BOOTSTRAP_SERVERS'.
+            timeout (float, optional): Seconds flush() waits for each send to be acknowledged. Defaults to 30.0.
+            **config: Extra kafka-python settings (security_protocol, sasl_mechanism, ...).
+
+        Raises:
+            ImportError: If kafka-python is not installed.
+        """
+        try:
+            import kafka  # noqa: F401
+        except ImportError:
+            raise ImportError("kafka-python is required for KafkaBroker. Install it with 'pip install kafka-python'.")
+
+        self.bootstrap_servers = bootstrap_servers or os.getenv(bootstrap_env_var, 'localhost:9092')
+        self.config = config
+        self.timeout = timeout
+        self.producer = None
+        self.pending = []
+        print("KafkaBroker initialized")
+
+    def produce(self, topic: str, key: bytes, value: bytes) -> None:
+        if self.producer is None:
+            from kafka import KafkaProducer
+            self.producer = KafkaProducer(bootstrap_servers=self.bootstrap_servers, **self.config)
+        self.pending.append(self.producer.send(topic, key=key, value=value))
+
+    def flush(self) -> None:
+        if self.producer is None:
+            return
+        self.producer.flush()
+        # kafka-python's flush() does not raise for failed sends, the futures do
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.get(timeout=self.timeout)
+
+    def consumer(self, topic: str, group_id: str, partitions: Optional[List[int]] = None) -> 'KafkaTopicConsumer':
+        return KafkaTopicConsumer(self, topic, group_id)
+
+
+class KafkaTopicConsumer:
+    """
+    Reads a Kafka topic on behalf of a consumer group, with auto commit turned off.
+
+    Partitions are assigned by the broker, so scaling out is just starting more
+    consumers with the same group_id.
+    """
+
+    def __init__(self, broker: KafkaBroker, topic: str, group_id: str):
+        from kafka import KafkaConsumer
+        self.consumer = KafkaConsumer(topic,
+                                      group_id=group_id,
+                                      bootstrap_servers=broker.bootstrap_servers,
+                                      enable_auto_commit=False,
+                                      auto_offset_reset='earliest',
+                                      **broker.config)
+
+    def poll(self, max_records: int = 500, timeout: float = 1.0) -> List[Record]:
+        batches = self.consumer.poll(timeout_ms=int(timeout * 1000), max_records=max_records)
+        return [Record(message.partition, message.offset, message.key, message.value)
+                for messages in batches.values() for message in messages]
+
+    def commit(self) -> None:
+        # Commits the current position of every assigned partition
+        self.consumer.commit()
+
+    def rollback(self) -> None:
+        for partition in self.consumer.assignment():
+            offset = self.consumer.committed(partition)
+            if offset is None:
+                self.consumer.seek_to_beginning(partition)
+            else:
+                self.consumer.seek(partition, offset)
+
+    def close(self) -> None:
+        self.consumer.close()
@@ -0,0 +1,325 @@
+import json
+import pandas as pd
+from typing import Any, Callable, Optional
+
+from etl.binance_extract import BinanceExtractor
+from etl.binance_transform import BinanceTransform, interval_to_offset
+from sql.sql_load import SQLLoader
+
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+
+def ohlcv_topic(interval: str) -> str:
+    """
+    Name of the topic carrying bars of one interval. Each interval gets its own topic so
+    consumers for different tables never see each other's bars.
+
+    Args:
+        interval (str): The candlestick interval (e.g., '1h', '1d').
+
+    Returns:
+        str: The topic name, e.g. 'ohlcv_1h'.
+    """
+    return f'ohlcv_{interval}'
+
+
+def encode_ohlcv(df: pd.DataFrame, interval: str) -> bytes:
+    """
+    Encodes one ticker's cleaned OHLCV DataFrame as a columnar JSON message.
+
+    Args:
+        df (pd.DataFrame): Output of clean_ohlcv for a single ticker.
+        interval (str): The candlestick interval of the bars.
+
+    Returns:
+        bytes: The message value.
+    """
+    message = {
+        'ticker_symbol': df['ticker_symbol'].iloc[0],
+        'exchange_name': df['exchange_name'].iloc[0],
+        'interval': interval,
+        'date': pd.to_datetime(df['date']).dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+    }
+    for col in OHLCV_COLUMNS:
+        message[col] = df[col].astype(float).tolist()
+    return json.dumps(message).encode('utf-8')
+
+
+def decode_ohlcv(value: bytes) -> pd.DataFrame:
+    """
+    Decodes a message written by encode_ohlcv back into a cleaned OHLCV DataFrame.
+
+    Args:
+        value (bytes): The message value.
+
+    Returns:
+        pd.DataFrame: DataFrame with date, OHLCV, ticker_symbol and exchange_name columns.
+                      The interval of the bars is kept in df.attrs['interval'].
+    """
+    message = json.loads(value)
+    df = pd.DataFrame({col: message[col] for col in ['date'] + OHLCV_COLUMNS})
+    df['date'] = pd.to_datetime(df['date'])
+    df['ticker_symbol'] = message['ticker_symbol']
+    df['exchange_name'] = message['exchange_name']
+    df.attrs['interval'] = message['interval']
+    return df
+
+
+class OHLCVPublisher:
+    """
+    Extract side of the bus: pulls OHLCV data from Binance and publishes it to a topic.
+
+    A ticker's bars are split into messages of at most bars_per_message bars, all keyed
+    by ticker symbol, so each ticker always lands in the same partition in order and
+    no message grows past the broker's size limit. Only closed bars are published, and
+    repeated calls for the same ticker only publish bars newer than the last one sent.
+    No database connection is needed in this process.
+
+    Attributes:
+        df_ohlcv (pd.DataFrame): Latest extracted/cleaned OHLCV data
+        broker: FileBroker or KafkaBroker the batches are published to
+        topic (Optional[str]): Topic name, None for one topic per interval
+        bars_per_message (int): Maximum number of bars in one message
+        last_published (dict): Open time of the last bar published per (ticker_symbol, exchange_name, interval)
+        extractor (BinanceExtractor): Instance of BinanceExtractor
+        transform (BinanceTransform): Instance of BinanceTransform
+    """
+
+    def __init__(self,
+                 broker,
+                 topic: Optional[str] = None,
+                 bars_per_message: int = 1000,
+                 api_key: str = None,
+                 api_secret: str = None,
+                 tld: str = 'us',
+                 extractor_factory: Callable[..., Any] = BinanceExtractor):
+        """
+        Initialize OHLCVPublisher with its component classes.
+
+        Args:
+            broker: FileBroker or KafkaBroker to publish to.
+            topic (str, optional): Topic name. Defaults to None, which publishes to ohlcv_topic(interval).
+            bars_per_message (int, optional): Maximum number of bars in one message. About 100 bytes
+                                              per bar, so the default stays far below Kafka's 1 MB limit. Defaults to 1000.
+            api_key (str, optional): Binance API key. Defaults to None.
+            api_secret (str, optional): Binance API secret. Defaults to None.
+            tld (str, optional): Top-level domain for Binance. Defaults to 'us'.
+            extractor_factory (Callable, optional): Builds the extractor (or a fake). Defaults to BinanceExtractor.
+        """
+        self.df_ohlcv = None
+        self.broker = broker
+        self.topic = topic
+        self.bars_per_message = bars_per_message
+        self.last_published = {}
+        self.extractor = extractor_factory(api_key=api_key, api_secret=api_secret, tld=tld, manager=self)
+        self.transform = BinanceTransform(manager=self)
+
+    def get_ohlcv(self, **kwargs) -> Optional[pd.DataFrame]:
+        return self.extractor.get_ohlcv(**kwargs)
+
+    def clean_ohlcv(self, **kwargs) -> pd.DataFrame:
+        return self.transform.clean_ohlcv(**kwargs)
+
+    def publish_ohlcv(self,
+                      ticker_symbol: str = 'BTC/USDT',
+                      exchange_name: str = 'Binance',
+                      interval: str = '1d',
+                      start_date: str = '5 years ago UTC') -> int:
+        """
+        Extracts, cleans and publishes the closed OHLCV bars of one ticker.
+
+        Args:
+            ticker_symbol (str): Ticker symbol as stored in the database (e.g., 'BTC/USDT'). Defaults to 'BTC/USDT'.
+            exchange_name (str): Exchange name as stored in the database. Defaults to 'Binance'.
+            interval (str): The candlestick interval (e.g., '1d', '1h', '15m'). Defaults to '1d'.
+            start_date (str): The start date for historical data, used until a bar of this ticker
+                              has been published. Defaults to '5 years ago UTC'.
+
+        Returns:
+            int: Number of bars published.
+
+        Raises:
+            Exception: Any API or network error from Binance, and any produce error from the broker.
+        """
+        key = (ticker_symbol, exchange_name, interval)
+        last = self.last_published.get(key)
+        if last is not None:
+            start_date = int(last.tz_localize('UTC').timestamp() * 1000)
+
+        raw_df = self.get_ohlcv(ticker=ticker_symbol.replace('/', ''), interval=interval,
+                                start_date=start_date, raise_errors=True)
+        if raw_df is None:
+            print(f"No new data for {ticker_symbol}")
+            return 0
+
+        df = self.clean_ohlcv(ticker_symbol=ticker_symbol, exchange_name=exchange_name)
+        # Keep closed bars only, and nothing that was already published
+        now = pd.Timestamp.now(tz='UTC').tz_localize(None)
+        keep = df['date'] + interval_to_offset(interval) <= now
+        if last is not None:
+            keep &= df['date'] > last
+        df = df[keep]
+        if df.empty:
+            print(f"No new closed bars for {ticker_symbol}")
+            return 0
+
+        topic = self.topic or ohlcv_topic(interval)
+        for start in range(0, len(df), self.bars_per_message):
+            batch = df.iloc[start:start + self.bars_per_message]
+            self.broker.produce(topic, key=ticker_symbol.encode('utf-8'), value=encode_ohlcv(batch, interval))
+        # Raises if any message was not acknowledged
+        self.broker.flush()
+        self.last_published[key] = df['date'].max()
+        print(f'Published {len(df)} bars for {ticker_symbol} to {topic}')
+        return len(df)
+
+
+class OHLCVConsumer:
+    """
+    Load side of the bus: reads OHLCV batches of one interval and writes them through SQLLoader.
+
+    Offsets are only committed after the batch is inserted. If the insert fails, a ticker
+    is still missing from the lookup table after refreshing it, or a message carries bars
+    of another interval, the consumer rewinds to the last committed offsets and raises,
+    so no batch is ever lost. Rows already in the table are skipped, so a redelivered
+    batch is not inserted twice (the table needs a unique key on ticker_id, exchange_id, date).
+
+    Attributes:
+        df_sql (pd.DataFrame): Ticker lookup table used to resolve ticker and exchange ids
+        df_ohlcv_wrangled (pd.DataFrame): Latest batch ready to insert
+        interval (str): Interval of the bars this consumer loads
+        schema (str): Target schema
+        table_name (str): Target table
+        consumer: Consumer returned by broker.consumer()
+        transform (BinanceTransform): Instance of BinanceTransform
+        loader (SQLLoader): Instance of SQLLoader
+    """
+
+    def __init__(self,
+                 broker,
+                 interval: str = '1d',
+                 schema: str = 'crypto',
+                 table_name: str = 'ohlcv_daily',
+                 topic: Optional[str] = None,
+                 group_id: str = 'ohlcv-sql-loader',
+                 partitions: list = None,
+                 host: str = 'localhost',
+                 port: int = 5432,
+                 database: str = 'postgres',
+                 username: str = 'postgres',
+                 password_env_var: str = 'POSTGRESQL_PASSWORD',
+                 loader_factory: Callable[..., Any] = SQLLoader):
+        """
+        Initialize OHLCVConsumer with its component classes.
+
+        Args:
+            broker: FileBroker or KafkaBroker to consume from.
+            interval (str, optional): Interval of the bars to load. Defaults to '1d'.
+            schema (str, optional): Target schema. Defaults to 'crypto'.
+            table_name (str, optional): Target table for bars of this interval. Defaults to 'ohlcv_daily'.
+            topic (str, optional): Topic name. Defaults to None, which reads ohlcv_topic(interval).
+            group_id (str, optional): Consumer group name. Defaults to 'ohlcv-sql-loader'.
+            partitions (list, optional): Partitions to read, FileBroker only. Defaults to all partitions.
+            host (str, optional): Database host. Defaults to 'localhost'.
+            port (int, optional): Database port. Defaults to 5432.
+            database (str, optional): Database name. Defaults to 'postgres'.
+            username (str, optional): Database username. Defaults to 'postgres'.
+            password_env_var (str, optional): Environment variable for DB password. Defaults to 'POSTGRESQL_PASSWORD'.
+            loader_factory (Callable, optional): Builds the loader (or a fake). Defaults to SQLLoader.
+        """
+        self.df_ohlcv = None
+        self.df_sql = None
+        self.df_ohlcv_wrangled = None
+        self.interval = interval
+        self.schema = schema
+        self.table_name = table_name
+
+        self.consumer = broker.consumer(topic or ohlcv_topic(interval), group_id, partitions)
+        self.transform = BinanceTransform(manager=self)
+        self.loader = loader_factory(
+            host=host,
+            port=port,
+            database=database,
+            username=username,
+            password_env_var=password_env_var,
+            manager=self
+        )
+
+    def missing_tickers(self, df: pd.DataFrame) -> set:
+        keys = ['ticker_symbol', 'exchange_name']
+        known = set(map(tuple, self.df_sql[keys].values.tolist()))
+        return set(map(tuple, df[keys].drop_duplicates().values.tolist())) - known
+
+    def load_batch(self, max_records: int = 500, timeout: float = 1.0) -> Optional[int]:
+        """
+        Polls one batch of messages, inserts it and commits the offsets.
+
+        Args:
+            max_records (int): Maximum number of messages per batch. Defaults to 500.
+            timeout (float): Seconds to wait for messages. Defaults to 1.0.
+
+        Returns:
+            Optional[int]: Number of rows in the batch, or None if the poll returned no messages.
+
+        Raises:
+            ValueError: If a message holds bars of another interval, or a ticker in the batch
+                        is not in the lookup table, even after refreshing it.
+        """
+        records = self.consumer.poll(max_records=max_records, timeout=timeout)
+        if not records:
+            return None
+
+        try:
+            frames = [decode_ohlcv(record.value) for record in records]
+            intervals = {frame.attrs['interval'] for frame in frames} - {self.interval}
+            if intervals:
+                raise ValueError(f"Batch has {sorted(intervals)} bars, this consumer loads {self.interval} "
+                                 f"bars into {self.schema}.{self.table_name}")
+            df = pd.concat(frames, ignore_index=True)
+            # The lookup is cached, re-read it when a batch has a ticker it does not know yet
+            if self.df_sql is None or self.missing_tickers(df):
+                self.loader.read_sql_to_df(table_name='vw_exchange_ticker_asset_lookup', schema='public')
+            missing = self.missing_tickers(df)
+            if missing:
+                raise ValueError(f"Tickers not found in vw_exchange_ticker_asset_lookup: {sorted(missing)}")
+            self.transform.wrangle_ohlcv(df_ohlcv=df, df_sql=self.df_sql)
+            self.loader.insert_df_to_sql(df=self.df_ohlcv_wrangled, schema=self.schema,
+                                         table_name=self.table_name, skip_duplicates=True)
+        except Exception as e:
+            print(f"Error loading batch of {len(records)} messages: {str(e)}")
+            self.consumer.rollback()
+            raise
+
+        self.consumer.commit()
+        rows = len(self.df_ohlcv_wrangled)
+        self.df_ohlcv_wrangled = None
+        return rows
+
+    def run(self, max_batches: Optional[int] = None, stop_when_idle: bool = False, **kwargs) -> int:
+        """
+        Keeps loading batches until stopped.
+
+        Args:
+            max_batches (Optional[int]): Stop after this many non-empty polls. Defaults to None (run forever).
+            stop_when_idle (bool): Stop as soon as a poll returns no messages. Defaults to False.
+            **kwargs: Passed to load_batch.
+
+        Returns:
+            int: Total number of rows loaded.
+        """
+        total = 0
+        batches = 0
+        try:
+            while max_batches is None or batches < max_batches:
+                rows = self.load_batch(**kwargs)
+                if rows is None:
+                    if stop_when_idle:
+                        break
+                    continue
+                batches += 1
+                total += rows
+        finally:
+            self.consumer.close()
+        print(f'Loaded {total} rows in {batches} batches')
+        return total
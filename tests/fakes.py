@@ -0,0 +1,80 @@
+import pandas as pd
+from typing import Optional
+
+
+class FakeExtractor:
+    """
+    Stand-in for BinanceExtractor that serves daily bars from memory instead of the Binance API.
+
+    Every ticker gets one bar per day from FIRST_BAR up to (not including) end_date.
+    Calls are recorded in the class attribute `calls` so tests can check what was requested.
+    """
+
+    FIRST_BAR = pd.Timestamp('2024-01-01')
+    calls = []
+
+    def __init__(self, manager=None, **kwargs):
+        self.manager = manager
+
+    def get_ohlcv(self,
+                  ticker: str = 'BTCUSDT',
+                  interval: str = '1d',
+                  start_date='5 years ago UTC',
+                  end_date: Optional[int] = None,
+                  raise_errors: bool = False) -> Optional[pd.DataFrame]:
+        FakeExtractor.calls.append({'ticker': ticker, 'interval': interval,
+                                    'start_date': start_date, 'end_date': end_date})
+        start = self.FIRST_BAR
+        if isinstance(start_date, int):
+            start = max(start, pd.Timestamp(start_date, unit='ms'))
+        end = pd.Timestamp(end_date, unit='ms') if end_date is not None else pd.Timestamp('2024-01-10')
+
+        # Like Binance, the bar that opens at end_date is returned too
+        index = pd.date_range(start, end, freq='1D', name='timestamp')
+        if len(index) == 0:
+            return None
+        df = pd.DataFrame({
+            'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0,
+        }, index=index)
+        if self.manager is not None:
+            self.manager.df_ohlcv = df
+        return df
+
+
+class FakeLoader:
+    """
+    Stand-in for SQLLoader that keeps the lookup table and stored bars in memory.
+
+    `lookup` is what read_sql_to_df returns, `last_dates` maps (ticker_id, exchange_id) to the
+    latest stored bar, and every DataFrame passed to insert_df_to_sql is appended to `inserted`.
+    Set `fail_inserts` to make insert_df_to_sql raise, as a failing database would.
+    """
+
+    lookup = pd.DataFrame({
+        'ticker_id': [1, 2, 3],
+        'exchange_id': [1, 1, 2],
+        'ticker_symbol': ['BTC/USDT', 'ETH/USDT', 'BTC/USD'],
+        'exchange_name': ['Binance', 'Binance', 'Gemini'],
+        'trading': [True, True, True],
+    })
+    last_dates = {}
+    inserted = []
+    fail_inserts = False
+
+    def __init__(self, manager=None, **kwargs):
+        self.manager = manager
+
+    def read_sql_to_df(self, table_name, schema=None, **kwargs) -> pd.DataFrame:
+        df = self.lookup.copy()
+        if self.manager is not None:
+            self.manager.df_sql = df
+        return df
+
+    def query_full(self, query: str = '', **kwargs) -> list:
+        return [{'ticker_id': ticker_id, 'exchange_id': exchange_id, 'last_date': last_date}
+                for (ticker_id, exchange_id), last_date in self.last_dates.items()]
+
+    def insert_df_to_sql(self, df=None, index=False, schema='crypto', table_name='ohlcv_daily', **kwargs) -> None:
+        if FakeLoader.fail_inserts:
+            raise ConnectionError("Database is unavailable")
+        FakeLoader.inserted.append(df.copy())
@@ -0,0 +1,58 @@
+import time
+
+from stream.broker import FileBroker, partition_for
+
+
+def produce_all(broker, messages):
+    for key, value in messages:
+        broker.produce('ohlcv', key=key.encode('utf-8'), value=value.encode('utf-8'))
+
+
+def test_messages_for_a_key_stay_in_one_partition_in_order(tmp_path):
+    broker = FileBroker(str(tmp_path), num_partitions=3)
+    produce_all(broker, [('BTC/USDT', '1'), ('ETH/USDT', '1'), ('BTC/USDT', '2'), ('BTC/USDT', '3')])
+
+    records = broker.consumer('ohlcv', 'loader').poll()
+    btc = [record for record in records if record.key == b'BTC/USDT']
+    assert {record.partition for record in btc} == {partition_for(b'BTC/USDT', 3)}
+    assert [record.value for record in btc] == [b'1', b'2', b'3']
+
+
+def test_rollback_rewinds_to_committed_offsets(tmp_path):
+    broker = FileBroker(str(tmp_path), num_partitions=1)
+    produce_all(broker, [('BTC/USDT', '1'), ('BTC/USDT', '2'), ('BTC/USDT', '3')])
+
+    consumer = broker.consumer('ohlcv', 'loader')
+    assert [record.value for record in consumer.poll(max_records=1)] == [b'1']
+    consumer.commit()
+    assert [record.value for record in consumer.poll(max_records=1)] == [b'2']
+    consumer.rollback()
+    assert [record.value for record in consumer.poll()] == [b'2', b'3']
+
+    # A new consumer of the group resumes from the last commit
+    assert [record.value for record in broker.consumer('ohlcv', 'loader').poll()] == [b'2', b'3']
+
+
+def test_consumers_on_disjoint_partitions_keep_their_own_offsets(tmp_path):
+    broker = FileBroker(str(tmp_path), num_partitions=2)
+    keys = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT']
+    produce_all(broker, [(key, key) for key in keys])
+
+    first = broker.consumer('ohlcv', 'loader', partitions=[0])
+    second = broker.consumer('ohlcv', 'loader', partitions=[1])
+    seen = first.poll() + second.poll()
+    first.commit()
+    second.commit()
+    assert sorted(record.value.decode('utf-8') for record in seen) == sorted(keys)
+
+    # Both commits survived, so nothing is delivered again
+    assert broker.consumer('ohlcv', 'loader').poll(timeout=0) == []
+
+
+def test_idle_poll_waits_for_timeout(tmp_path):
+    broker = FileBroker(str(tmp_path), num_partitions=2, poll_interval=0.05)
+    consumer = broker.consumer('ohlcv', 'loader')
+
+    started = time.monotonic()
+    assert consumer.poll(timeout=0.3) == []
+    assert time.monotonic() - started >= 0.3
@@ -0,0 +1,104 @@
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+# Airflow reads its config on import, so point it at a throwaway home first
+os.environ.setdefault('AIRFLOW_HOME', tempfile.mkdtemp(prefix='odm_airflow_'))
+os.environ.setdefault('AIRFLOW__CORE__LOAD_EXAMPLES', 'False')
+
+pd = pytest.importorskip('pandas')
+# The repo's own airflow/ folder imports as a namespace package, so check for a real install
+pytest.importorskip('airflow.decorators')
+import airflow  # noqa: E402
+if not airflow.__version__.startswith('2.'):
+    pytest.skip('The DAG targets Airflow 2', allow_module_level=True)
+pytest.importorskip('binance')
+pytest.importorskip('sqlalchemy')
+
+from fakes import FakeExtractor, FakeLoader  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'airflow', 'dags'))
+import ohlcv_dag  # noqa: E402
+
+
+@pytest.fixture(scope='module')
+def airflow_db():
+    from airflow.models.pool import Pool
+    from airflow.utils import db
+
+    db.initdb()
+    Pool.create_or_update_pool(name=ohlcv_dag.BINANCE_POOL, slots=4, description='', include_deferred=False)
+    Pool.create_or_update_pool(name=ohlcv_dag.POSTGRES_POOL, slots=4, description='', include_deferred=False)
+
+
+def test_staging_path_requires_shared_dir(monkeypatch):
+    monkeypatch.delenv('ODM_STAGING_DIR', raising=False)
+    with pytest.raises(EnvironmentError):
+        ohlcv_dag.staging_path('binance_ohlcv', 1, 'raw', '20240110T000000')
+
+
+def test_staging_path_is_per_dag(tmp_path):
+    hourly = ohlcv_dag.staging_path('binance_ohlcv_1h', 1, 'raw', '20240110T000000', str(tmp_path))
+    daily = ohlcv_dag.staging_path('binance_ohlcv_1d', 1, 'raw', '20240110T000000', str(tmp_path))
+    assert hourly != daily
+    assert os.path.dirname(daily) == os.path.join(str(tmp_path), 'binance_ohlcv_1d')
+
+
+def test_dag_loads_only_new_bars_per_ticker(airflow_db, tmp_path):
+    FakeExtractor.calls = []
+    FakeLoader.inserted = []
+    FakeLoader.last_dates = {(1, 1): datetime(2024, 1, 5)}
+
+    dag = ohlcv_dag.create_ohlcv_dag(dag_id='binance_ohlcv_test',
+                                     extractor_factory=FakeExtractor,
+                                     loader_factory=FakeLoader,
+                                     staging_dir=str(tmp_path))
+    dag_run = dag.test(execution_date=datetime(2024, 1, 10, tzinfo=timezone.utc))
+    assert dag_run.state == 'success'
+
+    # Only the two Binance tickers are mapped, BTC/USDT resumes after its latest stored bar
+    calls = {call['ticker']: call for call in FakeExtractor.calls}
+    assert sorted(calls) == ['BTCUSDT', 'ETHUSDT']
+    assert calls['BTCUSDT']['start_date'] == int(pd.Timestamp('2024-01-05', tz='UTC').timestamp() * 1000)
+    assert calls['ETHUSDT']['start_date'] == '5 years ago UTC'
+
+    # XCom only carries small handles pointing into the staging dir
+    handle = dag_run.get_task_instance('transform', map_index=0).xcom_pull(task_ids='transform', map_indexes=0)
+    assert handle['ticker_symbol'] == 'BTC/USDT'
+    assert handle['path'] == os.path.join(str(tmp_path), 'binance_ohlcv_test',
+                                          f'{dag_run.logical_date:%Y%m%dT%H%M%S}_1_wrangled.pkl')
+    assert handle['end_date'] == '2024-01-10T00:00:00'
+
+    # Stored bars and the still open 2024-01-10 bar are dropped, staged files are cleaned up
+    loaded = {int(df['ticker_id'].iloc[0]): df for df in FakeLoader.inserted}
+    assert sorted(loaded) == [1, 2]
+    assert loaded[1]['date'].min() == pd.Timestamp('2024-01-06')
+    assert loaded[1]['date'].max() == pd.Timestamp('2024-01-09')
+    assert len(loaded[1]) == 4
+    assert len(loaded[2]) == 9
+    assert list(loaded[2].columns) == ['ticker_id', 'exchange_id', 'date', 'open', 'high', 'low', 'close', 'volume']
+    assert os.listdir(tmp_path / 'binance_ohlcv_test') == []
+
+
+def test_dag_skips_open_bar_when_interval_is_coarser_than_schedule(airflow_db, tmp_path):
+    FakeExtractor.calls = []
+    FakeLoader.inserted = []
+    FakeLoader.last_dates = {(1, 1): datetime(2024, 1, 5), (2, 1): datetime(2024, 1, 5)}
+
+    dag = ohlcv_dag.create_ohlcv_dag(dag_id='binance_ohlcv_hourly_test',
+                                     extractor_factory=FakeExtractor,
+                                     loader_factory=FakeLoader,
+                                     interval='1d',
+                                     schedule='@hourly',
+                                     staging_dir=str(tmp_path))
+    dag_run = dag.test(execution_date=datetime(2024, 1, 10, 12, tzinfo=timezone.utc))
+    assert dag_run.state == 'success'
+
+    # The 2024-01-10 daily bar opened before 12:00 but closes at midnight, so it is not loaded yet
+    for df in FakeLoader.inserted:
+        assert df['date'].min() == pd.Timestamp('2024-01-06')
+        assert df['date'].max() == pd.Timestamp('2024-01-09')
+    assert len(FakeLoader.inserted) == 2
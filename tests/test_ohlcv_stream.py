@@ -0,0 +1,111 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('binance')
+pytest.importorskip('sqlalchemy')
+
+from fakes import FakeExtractor, FakeLoader  # noqa: E402
+from stream.broker import FileBroker  # noqa: E402
+from stream.ohlcv_stream import (OHLCVConsumer, OHLCVPublisher, decode_ohlcv, encode_ohlcv,  # noqa: E402
+                                 ohlcv_topic)
+
+
+@pytest.fixture(autouse=True)
+def reset_fakes():
+    FakeExtractor.calls = []
+    FakeLoader.inserted = []
+    FakeLoader.fail_inserts = False
+    lookup = FakeLoader.lookup
+    yield
+    FakeLoader.lookup = lookup
+
+
+@pytest.fixture
+def broker(tmp_path):
+    return FileBroker(str(tmp_path), num_partitions=2)
+
+
+def publish(broker, ticker_symbol='BTC/USDT', interval='1d', bars=3):
+    df = pd.DataFrame({
+        'date': pd.date_range('2024-01-01', periods=bars, freq='1D'),
+        'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5, 'volume': 10.0,
+        'ticker_symbol': ticker_symbol, 'exchange_name': 'Binance',
+    })
+    broker.produce(ohlcv_topic(interval), key=ticker_symbol.encode('utf-8'), value=encode_ohlcv(df, interval))
+
+
+def make_consumer(broker, **kwargs):
+    return OHLCVConsumer(broker, loader_factory=FakeLoader, **kwargs)
+
+
+def test_successful_batch_commits_offsets(broker):
+    publish(broker, 'BTC/USDT')
+    publish(broker, 'ETH/USDT')
+
+    assert make_consumer(broker).load_batch(timeout=0) == 6
+    assert sum(len(df) for df in FakeLoader.inserted) == 6
+
+    # A new consumer of the group has nothing left to read
+    assert make_consumer(broker).load_batch(timeout=0) is None
+
+
+def test_failed_insert_keeps_offsets_and_redelivers(broker):
+    publish(broker, 'BTC/USDT')
+    consumer = make_consumer(broker)
+
+    FakeLoader.fail_inserts = True
+    with pytest.raises(ConnectionError):
+        consumer.load_batch(timeout=0)
+    assert FakeLoader.inserted == []
+    assert consumer.consumer.committed() == {partition: 0 for partition in consumer.consumer.assigned}
+
+    # A fresh consumer of the group and the rewound one both get the batch again
+    assert len(broker.consumer(ohlcv_topic('1d'), 'ohlcv-sql-loader').poll(timeout=0)) == 1
+    FakeLoader.fail_inserts = False
+    assert consumer.load_batch(timeout=0) == 3
+    assert len(FakeLoader.inserted) == 1
+
+
+def test_unknown_ticker_raises_without_committing(broker):
+    publish(broker, 'DOGE/USDT')
+    consumer = make_consumer(broker)
+
+    with pytest.raises(ValueError):
+        consumer.load_batch(timeout=0)
+    assert FakeLoader.inserted == []
+    assert consumer.consumer.committed() == {partition: 0 for partition in consumer.consumer.assigned}
+
+    # Once the ticker is in the lookup the batch goes through
+    FakeLoader.lookup = pd.concat([FakeLoader.lookup, pd.DataFrame({
+        'ticker_id': [9], 'exchange_id': [1], 'ticker_symbol': ['DOGE/USDT'],
+        'exchange_name': ['Binance'], 'trading': [True]})], ignore_index=True)
+    assert make_consumer(broker).load_batch(timeout=0) == 3
+
+
+def test_consumer_rejects_bars_of_another_interval(broker):
+    publish(broker, 'BTC/USDT', interval='1h')
+    consumer = make_consumer(broker, interval='1d', topic=ohlcv_topic('1h'))
+
+    with pytest.raises(ValueError):
+        consumer.load_batch(timeout=0)
+    assert FakeLoader.inserted == []
+
+
+def test_intervals_use_separate_topics(broker):
+    publish(broker, 'BTC/USDT', interval='1h')
+    assert make_consumer(broker, interval='1d').load_batch(timeout=0) is None
+    assert make_consumer(broker, interval='1h', table_name='ohlcv_hourly').load_batch(timeout=0) == 3
+
+
+def test_publisher_only_sends_new_closed_bars_in_bounded_messages(broker):
+    publisher = OHLCVPublisher(broker, bars_per_message=4, extractor_factory=FakeExtractor)
+
+    # FakeExtractor serves 2024-01-01 .. 2024-01-10, all long closed
+    assert publisher.publish_ohlcv(ticker_symbol='BTC/USDT', interval='1d') == 10
+    records = broker.consumer(ohlcv_topic('1d'), 'check').poll(timeout=0)
+    assert [len(decode_ohlcv(record.value)) for record in records] == [4, 4, 2]
+    assert {record.key for record in records} == {b'BTC/USDT'}
+
+    # The next call resumes from the last published bar and finds nothing new
+    assert publisher.publish_ohlcv(ticker_symbol='BTC/USDT', interval='1d') == 0
+    assert FakeExtractor.calls[1]['start_date'] == int(pd.Timestamp('2024-01-10', tz='UTC').timestamp() * 1000)
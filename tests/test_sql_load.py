@@ -0,0 +1,130 @@
+import struct
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('sqlalchemy')
+
+from sql.sql_load import COPY_SIGNATURE, PG_EPOCH_US, build_ohlcv_bucket_query, decode_ohlcv_copy  # noqa: E402
+
+
+def pg_timestamp(value: str) -> int:
+    # Microseconds since 2000-01-01, as PostgreSQL sends timestamps in binary COPY
+    return int(np.datetime64(value, 'us').astype('int64')) - PG_EPOCH_US
+
+
+def copy_stream(rows, extension: bytes = b'') -> bytes:
+    """Builds a binary COPY stream, None fields are sent as NULL."""
+    data = COPY_SIGNATURE + struct.pack('>ii', 0, len(extension)) + extension
+    for row in rows:
+        data += struct.pack('>h', len(row))
+        for i, value in enumerate(row):
+            if value is None:
+                data += struct.pack('>i', -1)
+            elif i == 0:
+                data += struct.pack('>iq', 8, value)
+            else:
+                data += struct.pack('>id', 8, value)
+    return data + struct.pack('>h', -1)
+
+
+ROWS = [
+    (pg_timestamp('2024-01-01T00:00'), 1.0, 2.0, 0.5, 1.5, 100.0),
+    (pg_timestamp('2024-01-01T01:00'), 1.5, 3.0, 1.0, 2.5, 250.0),
+]
+
+
+def test_decodes_fixed_width_rows():
+    arrays = decode_ohlcv_copy(copy_stream(ROWS))
+    assert arrays['date'].dtype == np.dtype('datetime64[us]')
+    assert list(arrays['date']) == [np.datetime64('2024-01-01T00:00'), np.datetime64('2024-01-01T01:00')]
+    np.testing.assert_array_equal(arrays['open'], [1.0, 1.5])
+    np.testing.assert_array_equal(arrays['high'], [2.0, 3.0])
+    np.testing.assert_array_equal(arrays['low'], [0.5, 1.0])
+    np.testing.assert_array_equal(arrays['close'], [1.5, 2.5])
+    np.testing.assert_array_equal(arrays['volume'], [100.0, 250.0])
+
+
+def test_null_fields_fall_back_to_nan_and_nat():
+    rows = [ROWS[0], (None, 1.5, None, 1.0, 2.5, 250.0)]
+    arrays = decode_ohlcv_copy(copy_stream(rows))
+    assert arrays['date'][0] == np.datetime64('2024-01-01T00:00')
+    assert np.isnat(arrays['date'][1])
+    np.testing.assert_array_equal(arrays['open'], [1.0, 1.5])
+    assert arrays['high'][0] == 2.0 and np.isnan(arrays['high'][1])
+    np.testing.assert_array_equal(arrays['volume'], [100.0, 250.0])
+
+
+def test_empty_result():
+    arrays = decode_ohlcv_copy(copy_stream([]))
+    assert sorted(arrays) == ['close', 'date', 'high', 'low', 'open', 'volume']
+    assert all(len(array) == 0 for array in arrays.values())
+    assert arrays['date'].dtype == np.dtype('datetime64[us]')
+
+
+def test_header_extension_is_skipped():
+    arrays = decode_ohlcv_copy(copy_stream(ROWS, extension=b'\x00\x01\x02\x03\x04'))
+    assert list(arrays['date']) == [np.datetime64('2024-01-01T00:00'), np.datetime64('2024-01-01T01:00')]
+    np.testing.assert_array_equal(arrays['close'], [1.5, 2.5])
+
+
+def test_rejects_non_copy_data_and_unexpected_field_widths():
+    with pytest.raises(ValueError):
+        decode_ohlcv_copy(b'not a copy stream')
+
+    # A 4 byte date field, as sent for an uncast date column
+    data = COPY_SIGNATURE + struct.pack('>ii', 0, 0) + struct.pack('>hii', 6, 4, 8766)
+    data += b''.join(struct.pack('>id', 8, 1.0) for _ in range(5)) + struct.pack('>h', -1)
+    with pytest.raises(ValueError):
+        decode_ohlcv_copy(data)
+
+    # Cut off partway through a row, with and without the trailer
+    data = copy_stream(ROWS)
+    for truncated in (data[:-20], data[:-22] + struct.pack('>h', -1), data[:len(COPY_SIGNATURE) + 4]):
+        with pytest.raises(ValueError):
+            decode_ohlcv_copy(truncated)
+
+    # Header extension running past the end of the data
+    with pytest.raises(ValueError):
+        decode_ohlcv_copy(COPY_SIGNATURE + struct.pack('>ii', 0, 100) + struct.pack('>h', -1))
+
+
+def test_bucket_query_rejects_unsupported_intervals():
+    for interval in ('1x', '4', 'h', '0h', '1H'):
+        with pytest.raises(ValueError):
+            build_ohlcv_bucket_query(interval=interval)
+    with pytest.raises(ValueError):
+        build_ohlcv_bucket_query(interval='3M', timescale=False)
+    # TimescaleDB buckets by months too
+    build_ohlcv_bucket_query(interval='3M')
+
+
+def test_bucket_query_uses_time_bucket_on_timescale():
+    query, params = build_ohlcv_bucket_query(ticker_symbol='ETH/USDT', interval='4h', table_name='ohlcv_hourly')
+    assert 'time_bucket(%(bucket)s::interval, o.date)' in query
+    assert 'first(o.open, o.date)' in query and 'last(o.close, o.date)' in query
+    assert 'FROM crypto.ohlcv_hourly o' in query
+    assert params['bucket'] == '4 hours'
+    assert params['ticker_symbol'] == 'ETH/USDT'
+    assert params['exchange_name'] == 'Binance'
+
+
+def test_bucket_query_on_plain_postgres():
+    query, params = build_ohlcv_bucket_query(interval='1w', timescale=False)
+    assert 'date_trunc(%(unit)s, o.date)' in query
+    assert 'time_bucket' not in query and 'first(' not in query
+    assert params['unit'] == 'week'
+
+    query, params = build_ohlcv_bucket_query(interval='15m', timescale=False)
+    assert "date_bin(%(bucket)s::interval, o.date, TIMESTAMP '2000-01-03')" in query
+    assert params['bucket'] == '15 minutes'
+
+
+def test_bucket_query_bounds_and_quoting():
+    query, _ = build_ohlcv_bucket_query()
+    assert '%(start)s' not in query and '%(end)s' not in query
+
+    query, params = build_ohlcv_bucket_query(start='2024-01-01', end='2024-02-01', table_name='OHLCV Daily')
+    assert 'o.date >= %(start)s' in query and 'o.date < %(end)s' in query
+    assert (params['start'], params['end']) == ('2024-01-01', '2024-02-01')
+    assert 'crypto."OHLCV Daily"' in query